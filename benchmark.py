@@ -0,0 +1,276 @@
+"""
+Benchmarks for the performance-oriented engines of the daily solutions.
+
+Usage: python benchmark.py [name ...]
+
+Without arguments all benchmarks are run. Sizes are kept moderate by default,
+pass larger ones by calling the benchmark functions directly.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+def measure(function: Callable, *args):
+    """ Runs the function once and returns its result and the elapsed time in seconds. """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def report(name: str, baseline: float, optimized: float):
+    """ Prints timings of the baseline and optimized versions. """
+    print(f"{name}: baseline {baseline:.3f}s, optimized {optimized:.3f}s, "
+          f"speedup {baseline / optimized:.1f}x")
+
+def bench_day_1_numpy(size: int = 10 ** 7):
+    """ day_1.compute_sum vs day_1.compute_sum_numpy """
+    import day_1
+    captcha = bytes(random.choices(b'0123456789', k=size))
+    numbers = list(map(lambda c: c - 48, captcha))
+    digits = day_1.load_digits(captcha)
+    for stride in (1, size // 2):
+        expected, baseline = measure(day_1.compute_sum, numbers, stride)
+        result, optimized = measure(day_1.compute_sum_numpy, digits, stride)
+        assert result == expected
+        report(f"day 1, {size} digits, stride {stride}", baseline, optimized)
+
+def bench_day_1_parallel(size: int = 10 ** 8):
+    """ day_1.compute_sum_file vs day_1.compute_sum_parallel with growing worker counts """
+    import day_1
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'captcha.txt')
+        with open(file_name, 'wb') as file:
+            remaining = size
+            while remaining > 0:
+                block = min(day_1.CHUNK_SIZE, remaining)
+                file.write(bytes(random.choices(b'0123456789', k=block)))
+                remaining -= block
+
+        expected, baseline = measure(day_1.compute_sum_file, file_name, 1)
+        workers = 1
+        while workers <= os.cpu_count():
+            result, optimized = measure(day_1.compute_sum_parallel, file_name, 1, workers)
+            assert result == expected
+            report(f"day 1, parallel, {workers} workers", baseline, optimized)
+            workers *= 2
+
+def bench_day_2_matrix(size: int = 10 ** 4):
+    """ Row-wise part 1 of day 2 vs day_2.load_matrix with vectorized reductions """
+    import numpy as np
+    import day_2
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'sheet.txt')
+        with open(file_name, 'w') as file:
+            for _ in range(size):
+                row = np.random.randint(1, 10 ** 6, size=size)
+                file.write('\t'.join(map(str, row.tolist())) + '\n')
+
+        def row_wise():
+            with open(file_name, 'rb') as file:
+                return sum(max(numbers) - min(numbers)
+                           for numbers in (list(map(int, line.split())) for line in file))
+
+        def load():
+            with open(file_name, 'rb') as file:
+                return day_2.load_matrix(file)
+
+        expected, baseline = measure(row_wise)
+        matrix, parsing = measure(load)
+        result, reduction = measure(day_2.compute_checksum1_matrix, matrix)
+        assert result == expected
+        report(f"day 2, {size}x{size} sheet, part 1 including parsing", baseline,
+               parsing + reduction)
+        print(f"day 2, {size}x{size} sheet: parsing {parsing:.3f}s, reduction {reduction:.3f}s")
+
+def bench_day_4_validator(lines: int = 10 ** 7):
+    """ Original day 4 loop vs day_4.count_valid """
+    import day_4
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'passphrases.txt')
+        with open(file_name, 'w') as file:
+            for _ in range(lines):
+                words = (''.join(random.choices(letters, k=random.randint(2, 7)))
+                         for _ in range(random.randint(3, 10)))
+                file.write(' '.join(words) + '\n')
+
+        def original():
+            valid_1 = 0
+            valid_2 = 0
+            with open(file_name) as input_file:
+                for line in input_file:
+                    words = line.split()
+                    unique_words = set(words)
+                    if words and (len(words) == len(unique_words)):
+                        valid_1 += 1
+
+                    for i in range(0, len(words)):
+                        words[i] = str(sorted(list(words[i])))
+                    unique_words = set(words)
+                    if len(words) == len(unique_words):
+                        valid_2 += 1
+            return valid_1, valid_2
+
+        def single_pass():
+            with open(file_name, 'rb') as input_file:
+                counts = day_4.count_valid(input_file, [day_4.NO_REPEATS, day_4.NO_ANAGRAMS])
+            return counts[day_4.NO_REPEATS.name], counts[day_4.NO_ANAGRAMS.name]
+
+        expected, baseline = measure(original)
+        result, optimized = measure(single_pass)
+        assert result == expected
+        report(f"day 4, {lines} lines", baseline, optimized)
+
+def bench_day_5_array(size: int = 10 ** 7):
+    """ Original day 5 part 2 loop on a list vs day_5.count_steps2 on an array """
+    from array import array
+    import day_5
+
+    def original(jumps):
+        index = 0
+        steps = 0
+        while (index >= 0) and (index < len(jumps)):
+            jump = jumps[index]
+            if jump < 3:
+                jumps[index] += 1
+            else:
+                jumps[index] -= 1
+            index += jump
+            steps += 1
+        return steps
+
+    jumps = day_5.load_jumps('day_5_input.txt')
+    expected, baseline = measure(original, jumps.tolist())
+    result, optimized = measure(day_5.count_steps2, array('i', jumps))
+    assert result == expected
+    report(f"day 5, {expected} steps", baseline, optimized)
+    print(f"day 5: {expected / baseline:.0f} steps/s before, {expected / optimized:.0f} steps/s after")
+
+    tracemalloc.start()
+    offsets = [random.randint(-1000, 2) for _ in range(size)]
+    list_memory = tracemalloc.get_traced_memory()[0]
+    jumps = array('i', offsets)
+    array_memory = tracemalloc.get_traced_memory()[0] - list_memory
+    tracemalloc.stop()
+    del jumps, offsets
+    print(f"day 5, {size} offsets: list {list_memory / size:.1f} bytes/offset, "
+          f"array {array_memory / size:.1f} bytes/offset")
+
+def bench_day_5_batch(lanes: int = 10 ** 4, size: int = 100):
+    """ Sequential day_5.count_steps2 vs lockstep day_5.count_steps2_batch """
+    import day_5
+    # backward jumps reach at most the list start, like in the puzzle input
+    jump_lists = [[random.randint(-i, 2) for i in range(size)] for _ in range(lanes)]
+
+    def sequential():
+        return [day_5.count_steps2(list(jumps)) for jumps in jump_lists]
+
+    expected, baseline = measure(sequential)
+    result, optimized = measure(day_5.count_steps2_batch, jump_lists)
+    assert result == expected
+    report(f"day 5, batch of {lanes} lists of {size} offsets", baseline, optimized)
+
+def bench_day_6_cycles(banks: int = 192, blocks: int = 96, seed: int = 0):
+    """ day_6.find_cycle_dict vs day_6.find_cycle_brent: time and peak memory """
+    import day_6
+    generator = random.Random(seed)
+    initial = [generator.randint(0, blocks) for _ in range(banks)]
+
+    results = dict()
+    for mode, find_cycle in day_6.CYCLE_FINDERS.items():
+        tracemalloc.start()
+        results[mode], elapsed = measure(find_cycle, initial)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        steps, loop_size = results[mode]
+        print(f"day 6, {banks} banks, {steps} steps, loop size {loop_size}, {mode} mode: "
+              f"{elapsed:.3f}s, peak memory {peak / 2 ** 20:.1f} MiB")
+    assert len(set(results.values())) == 1
+
+def write_tower(file_name: str, size: int):
+    """ Writes a random day 7 tower of the given size, every program stands on an earlier one """
+    children = [list() for _ in range(size)]
+    for index in range(1, size):
+        children[random.randrange(index)].append(index)
+    with open(file_name, 'w') as file:
+        for index in range(size):
+            line = f"p{index} ({random.randint(1, 100)})"
+            if children[index]:
+                line += ' -> ' + ', '.join(f"p{child}" for child in children[index])
+            file.write(line + '\n')
+
+def bench_day_7_tower(size: int = 10 ** 6, updates: int = 10 ** 5):
+    """ Rebuilding day 7 weights from scratch vs day_7.Tower incremental updates """
+    import day_7
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'tower.txt')
+        write_tower(file_name, size)
+
+        def rebuild():
+            root_node = day_7.read_tree(file_name)
+            return day_7.find_imbalance(root_node)
+
+        _, baseline = measure(rebuild)
+        tower = day_7.Tower(day_7.read_tree(file_name))
+
+    names = random.choices(list(tower.nodes), k=updates)
+    weights = random.choices(range(1, 101), k=updates)
+
+    def update():
+        for name, weight in zip(names, weights):
+            tower.set_weight(name, weight)
+            tower.is_balanced()
+
+    _, optimized = measure(update)
+    print(f"day 7, {size} programs: full rebuild {baseline:.3f}s, "
+          f"incremental update {optimized / updates * 1e6:.1f}us")
+
+def bench_day_7_compact(size: int = 10 ** 6):
+    """ Memory per program and read time of day_7.read_tree vs day_7.read_compact_tree """
+    import day_7
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'tower.txt')
+        write_tower(file_name, size)
+
+        def read_nodes(tower_file: str):
+            root_node = day_7.read_tree(tower_file)
+            root_node.update_children_weight()
+            return root_node
+
+        for name, read in (('nodes', read_nodes), ('compact', day_7.read_compact_tree)):
+            tower, elapsed = measure(read, file_name)
+            del tower
+
+            # tracing slows allocations down, so memory is measured in a separate run
+            tracemalloc.start()
+            tower = read(file_name)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del tower
+            print(f"day 7, {size} programs, {name}: {memory / size:.1f} bytes/program, "
+                  f"read in {elapsed:.3f}s")
+
+BENCHMARKS: Dict[str, Callable] = {
+    'day_1_numpy': bench_day_1_numpy,
+    'day_1_parallel': bench_day_1_parallel,
+    'day_2_matrix': bench_day_2_matrix,
+    'day_4_validator': bench_day_4_validator,
+    'day_5_array': bench_day_5_array,
+    'day_5_batch': bench_day_5_batch,
+    'day_6_cycles': bench_day_6_cycles,
+    'day_7_tower': bench_day_7_tower,
+    'day_7_compact': bench_day_7_compact,
+}
+
+def main():
+    """ Main function """
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+if __name__ == '__main__':
+    main()
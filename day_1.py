@@ -67,7 +67,16 @@ What is the solution to your new captcha?
 Your puzzle answer was 1152.
 """
 
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional
+import mmap
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def compute_sum(values: List[int], stride: int):
     """Computes sum of values that are equal to another value on the stride distance from it."""
@@ -77,11 +86,147 @@ def compute_sum(values: List[int], stride: int):
             summ += value
     return summ
 
+def load_digits(captcha: bytes):
+    """
+    Loads captcha digits into a NumPy array without going through Python ints. Trailing
+    whitespace (such as the newline of an input file) is ignored.
+    """
+    digits = np.frombuffer(captcha, dtype=np.uint8)[:captcha_length(captcha)] - 48
+    if (digits > 9).any():
+        raise RuntimeError("Captcha contains characters other than digits")
+    return digits
+
+def compute_sum_numpy(digits, stride: int):
+    """ Vectorized compute_sum for a NumPy array of digits. """
+    matches = digits == np.roll(digits, -stride)
+    return int(digits.sum(where=matches, dtype=np.int64))
+
+PROFILE_CHECK_LIMIT = 256
+
+def compute_sum_profile(digits) -> List[int]:
+    """
+    Computes compute_sum for every stride at once: element [stride] of the result is
+    the sum for that stride. Matches of each digit are counted with a circular FFT
+    autocorrelation of its indicator vector, which is O(n log n) instead of O(n^2).
+    """
+    digits = np.asarray(digits, dtype=np.int64)
+    size = len(digits)
+    profile = np.zeros(size, dtype=np.int64)
+    if size == 0:
+        return list()
+
+    for digit in range(1, 10):
+        indicator = (digits == digit).astype(np.float64)
+        if not indicator.any():
+            continue
+        spectrum = np.fft.rfft(indicator)
+        matches = np.fft.irfft(spectrum * np.conj(spectrum), size)
+        # the counts are integers, rounding removes the floating point noise
+        profile += digit * np.rint(matches).astype(np.int64)
+
+    profile = profile.tolist()
+
+    # cross-check against the direct computation while it is cheap
+    if size <= PROFILE_CHECK_LIMIT:
+        values = digits.tolist()
+        for stride in range(size):
+            assert profile[stride] == compute_sum(values, stride)
+
+    return profile
+
+CHUNK_SIZE = 1 << 24
+
+def captcha_length(buffer) -> int:
+    """ Returns the number of captcha digits in the buffer, ignoring trailing whitespace. """
+    length = len(buffer)
+    while length > 0 and buffer[length - 1] in b' \t\r\n':
+        length -= 1
+    return length
+
+def read_circular(buffer, length: int, start: int, size: int) -> bytes:
+    """ Reads size bytes starting at the start position, wrapping around at length. """
+    start %= length
+    end = start + size
+    if end <= length:
+        return buffer[start:end]
+    return buffer[start:length] + buffer[:end - length]
+
+def sum_range(buffer, length: int, stride: int, start: int, end: int) -> int:
+    """ Computes compute_sum for the [start, end) part of the captcha stored in the buffer. """
+    chunk = buffer[start:end]
+    ahead = read_circular(buffer, length, start + stride, end - start)
+    if np is not None:
+        digits = load_digits(chunk)
+        matches = digits == load_digits(ahead)
+        return int(digits.sum(where=matches, dtype=np.int64))
+    return sum(value - 48 for value, other in zip(chunk, ahead) if value == other)
+
+def map_captcha(file):
+    """ Memory-maps the captcha file, returns None for an empty file (those cannot be mapped). """
+    if os.fstat(file.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def get_captcha_length(file_name: str) -> int:
+    """ Returns the number of captcha digits in the file. """
+    with open(file_name, 'rb') as file:
+        buffer = map_captcha(file)
+        if buffer is None:
+            return 0
+        with buffer:
+            return captcha_length(buffer)
+
+def compute_sum_file(file_name: str, stride: int, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Computes compute_sum for a captcha file of any size. The file is memory-mapped and
+    processed chunk by chunk, so only two chunks are held in memory at a time.
+    """
+    summ = 0
+    with open(file_name, 'rb') as file:
+        buffer = map_captcha(file)
+        if buffer is None:
+            return 0
+        with buffer:
+            length = captcha_length(buffer)
+            for start in range(0, length, chunk_size):
+                summ += sum_range(buffer, length, stride, start, min(start + chunk_size, length))
+    return summ
+
+# captcha buffer of the current worker process, see compute_sum_parallel
+WORKER_BUFFER = None
+
+def init_worker(file_name: str):
+    """ Maps the captcha file once per worker process. """
+    global WORKER_BUFFER
+    with open(file_name, 'rb') as file:
+        WORKER_BUFFER = map_captcha(file)
+
+def sum_worker_range(length: int, stride: int, start: int, end: int) -> int:
+    """ Computes sum_range on the buffer of the current worker process. """
+    return sum_range(WORKER_BUFFER, length, stride, start, end)
+
+def compute_sum_parallel(file_name: str, stride: int, workers: Optional[int] = None,
+                         chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Computes compute_sum_file using a pool of worker processes. Every worker maps the
+    file itself, so the digits are shared through the page cache instead of being
+    copied, and gets ranges of chunk_size digits to sum.
+    """
+    length = get_captcha_length(file_name)
+    if length == 0:
+        return 0
+
+    starts = range(0, length, chunk_size)
+    ends = [min(start + chunk_size, length) for start in starts]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(file_name,)) as executor:
+        return sum(executor.map(sum_worker_range, repeat(length), repeat(stride), starts, ends))
+
 def main():
     """Main function"""
-    captcha = "61697637962276641366442297247367117738114719863473648131982449728688116728695866572989524473392982963976411147683588415878214189996163533584547175794158118148724298832798898333399786561459152644144669959887341481968319172987357989785791366732849932788343772112176614723858474959919713855398876956427631354172668133549845585632211935573662181331613137869866693259374322169811683635325321597242889358147123358117774914653787371368574784376721652181792371635288376729784967526824915192526744935187989571347746222113625577963476141923187534658445615596987614385911513939292257263723518774888174635963254624769684533531443745729344341973746469326838186248448483587477563285867499956446218775232374383433921835993136463383628861115573142854358943291148766299653633195582135934544964657663198387794442443531964615169655243652696782443394639169687847463721585527947839992182415393199964893658322757634675274422993237955354185194868638454891442893935694454324235968155913963282642649968153284626154111478389914316765783434365458352785868895582488312334931317935669453447478936938533669921165437373741448378477391812779971528975478298688754939216421429251727555596481943322266289527996672856387648674166997731342558986575258793261986817177487197512282162964167151259485744835854547513341322647732662443512251886771887651614177679229984271191292374755915457372775856178539965131319568278252326242615151412772254257847413799811417287481321745372879513766235745347872632946776538173667371228977212143996391617974367923439923774388523845589769341351167311398787797583543434725374343611724379399566197432154146881344528319826434554239373666962546271299717743591225567564655511353255197516515213963862383762258959957474789718564758843367325794589886852413314713698911855183778978722558742329429867239261464773646389484318446574375323674136638452173815176732385468675215264736786242866295648997365412637499692817747937982628518926381939279935993712418938567488289246779458432179335139731952167527521377546376518126276"
-    numbers = list(map((lambda c: ord(c) - 48), captcha))
-    print(compute_sum(numbers, 1))
-    print(compute_sum(numbers, int(len(numbers) / 2)))
+    file_name = 'day_1_input.txt'
+    print(compute_sum_file(file_name, 1))
+    print(compute_sum_file(file_name, get_captcha_length(file_name) // 2))
 
-main()
+if __name__ == '__main__':
+    main()
@@ -59,31 +59,186 @@ What is the sum of each row's result in your puzzle input?
 Your puzzle answer was 233.
 """
 
-from typing import List
-
-def compute_crc2(numbers: List[int]):
-    """Computes CRC2 for line"""
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import math
+import os
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def compute_crc2_pairwise(numbers: List[int]):
+    """ Computes CRC2 for a sorted line by checking every pair """
     for i, num1 in enumerate(reversed(numbers)):
         for num2 in numbers[:-(i+1)]:
             div, mod = divmod(num1, num2)
             if mod == 0:
                 return div
 
-def main():
-    """ Main function """
+def find_by_multiples(counts: Dict[int, int], values: List[int]):
+    """ Finds the CRC2 quotient by walking the multiples of every value up to the largest one """
+    largest = values[-1]
+    smallest_divisors = dict()
+    for value in values:
+        for multiple in range(2 * value, largest + 1, value):
+            if multiple in counts and multiple not in smallest_divisors:
+                smallest_divisors[multiple] = value
+
+    for value in reversed(values):
+        if value in smallest_divisors:
+            return value // smallest_divisors[value]
+        if counts[value] > 1:
+            return 1
+
+def find_by_divisors(counts: Dict[int, int], values: List[int]):
+    """ Finds the CRC2 quotient by enumerating divisors of every value, from the largest one """
+    for value in reversed(values):
+        cofactors = list()
+        for divisor in range(1, math.isqrt(value) + 1):
+            if value % divisor == 0:
+                if divisor < value and divisor in counts:
+                    return value // divisor
+                cofactors.append(value // divisor)
+
+        for cofactor in reversed(cofactors):
+            if cofactor < value and cofactor in counts:
+                return value // cofactor
+
+        if counts[value] > 1:
+            return 1
+
+def compute_crc2(numbers: List[int]):
+    """
+    Computes CRC2 for line: the quotient of the largest number that is divisible by another
+    one, using the smallest such divisor. The result is the same as compute_crc2_pairwise
+    gives for the sorted line, but the line does not need to be sorted.
+    """
+    if not numbers:
+        return None
+    if min(numbers) <= 0:
+        return compute_crc2_pairwise(sorted(numbers))
+
+    counts = Counter(numbers)
+    values = sorted(counts)
+
+    # pick the search that touches fewer candidates for this value range
+    multiples_cost = sum(values[-1] // value for value in values)
+    divisors_cost = sum(math.isqrt(value) for value in values)
+    if multiples_cost <= divisors_cost:
+        return find_by_multiples(counts, values)
+    return find_by_divisors(counts, values)
+
+BLOCK_SIZE = 1 << 22
+
+def compute_checksums(lines: Iterable) -> Tuple[int, int]:
+    """ Computes both checksums (part 1 and part 2) for the lines """
+    crc1 = 0
+    crc2 = 0
+    for line in lines:
+        numbers = list(map(int, line.split()))
+        if numbers:
+            # part 1
+            crc1 += max(numbers) - min(numbers)
+
+            # part 2
+            crc2 += compute_crc2(numbers)
+
+    return crc1, crc2
+
+def checksum_block(block: bytes) -> Tuple[int, int]:
+    """ Computes both checksums for a block of whole lines """
+    return compute_checksums(block.splitlines())
+
+def read_blocks(file: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """ Reads the file in blocks of about block_size bytes that end on a line boundary """
+    remainder = b''
+    while True:
+        data = file.read(block_size)
+        if not data:
+            break
+
+        data = remainder + data
+        end = data.rfind(b'\n') + 1
+        remainder = data[end:]
+        if end > 0:
+            yield data[:end]
+
+    if remainder:
+        yield remainder
+
+def compute_checksums_parallel(file_name: str, workers: Optional[int] = None,
+                               block_size: int = BLOCK_SIZE) -> Tuple[int, int]:
+    """
+    Computes both checksums for a spreadsheet file of any size. Blocks of whole lines are
+    handed to a pool of worker processes, at most two blocks per worker are in flight at a
+    time to keep the memory bounded.
+    """
+    workers = workers or os.cpu_count()
     crc1 = 0
     crc2 = 0
-    with open('day_2_input.txt') as f:
-        for line in f:
-            numbers = sorted(map(int, line.split()))
-            if numbers:
-                # part 1
-                crc1 += max(numbers) - min(numbers)
+    pending = deque()
+    with open(file_name, 'rb') as file, ProcessPoolExecutor(workers) as executor:
+        for block in read_blocks(file, block_size):
+            if len(pending) >= 2 * workers:
+                part1, part2 = pending.popleft().result()
+                crc1 += part1
+                crc2 += part2
+            pending.append(executor.submit(checksum_block, block))
+
+        while pending:
+            part1, part2 = pending.popleft().result()
+            crc1 += part1
+            crc2 += part2
+
+    return crc1, crc2
+
+def load_matrix(file: BinaryIO):
+    """
+    Parses a rectangular sheet into a 2D NumPy array in bulk. Returns None if the rows have
+    different lengths or there are no rows at all. Empty lines are skipped, as in
+    compute_checksums.
+    """
+    with warnings.catch_warnings():
+        # an empty file is reported with a warning, it is handled below
+        warnings.simplefilter('ignore', UserWarning)
+        try:
+            matrix = np.loadtxt(file, dtype=np.int64, ndmin=2)
+        except ValueError:
+            return None
+
+    if matrix.size == 0:
+        return None
+    return matrix
+
+def compute_checksum1_matrix(matrix) -> int:
+    """ Computes the part 1 checksum of a rectangular sheet with vectorized reductions """
+    return int((matrix.max(axis=1) - matrix.min(axis=1)).sum())
+
+def compute_checksums_file(file_name: str) -> Tuple[int, int]:
+    """
+    Computes both checksums for the file. Rectangular sheets are loaded into a NumPy array
+    for part 1, ragged ones (or missing NumPy) fall back to compute_checksums.
+    """
+    with open(file_name, 'rb') as file:
+        matrix = load_matrix(file) if np is not None else None
+        if matrix is None:
+            file.seek(0)
+            return compute_checksums(file)
+
+    crc1 = compute_checksum1_matrix(matrix)
+    crc2 = sum(compute_crc2(numbers) for numbers in matrix.tolist())
+    return crc1, crc2
 
-                # part 2
-                crc2 += compute_crc2(numbers)
+def main():
+    """ Main function """
+    crc1, crc2 = compute_checksums_file('day_2_input.txt')
 
     print(crc1)
     print(crc2)
 
-main()
+if __name__ == '__main__':
+    main()
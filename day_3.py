@@ -60,7 +60,15 @@ What is the first value written that is larger than your puzzle input?
 Your puzzle answer was 363010.
 """
 
+from typing import Iterable, List, Optional, Sequence, Tuple
+import bisect
 import math
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def find_index(x_coord: int, y_coord: int):
     """ Finds index by coordinates. Index starts from 1. """
@@ -80,7 +88,8 @@ def find_index(x_coord: int, y_coord: int):
 
 def find_coordinates(index: int):
     """ Finds coordinates by index. Index starts from 1. """
-    radius = math.floor(math.ceil(math.sqrt(index)) / 2)
+    # ceil(sqrt(index)) computed exactly, floating point breaks on large indices
+    radius = (math.isqrt(index - 1) + 1) // 2
     inner_edge = (2 * radius - 1)
     inner_points = inner_edge * inner_edge
     min_value = inner_points + 1
@@ -102,33 +111,183 @@ def count_steps(index: int):
     x_coord, y_coord = find_coordinates(index)
     return abs(x_coord) + abs(y_coord)
 
-def find_first_larger(value: int):
-    """ Finds first number in sequence that is larger than the provided value. """
-    numbers = [1]
+def isqrt_array(values):
+    """ Computes exact integer square roots of a non-negative int64 array. """
+    roots = np.sqrt(values.astype(np.float64)).astype(np.int64)
+
+    # floating point root is off by at most one, squares are compared as uint64 as
+    # (root + 1) ** 2 may not fit into int64 near its maximum
+    unsigned_values = values.astype(np.uint64)
+    unsigned_roots = roots.astype(np.uint64)
+    roots[unsigned_roots * unsigned_roots > unsigned_values] -= 1
+    unsigned_roots = roots.astype(np.uint64) + 1
+    roots[unsigned_roots * unsigned_roots <= unsigned_values] += 1
+    return roots
+
+def find_coordinates_array(indices):
+    """ Vectorized find_coordinates for an int64 array of indices. """
+    radius = (isqrt_array(indices - 1) + 1) // 2
+    inner_edge = 2 * radius - 1
+    value = indices - inner_edge * inner_edge - 1
+    edge = 2 * radius
+    side = np.clip(value // np.maximum(edge, 1), 0, 3)
+    shift = value - side * edge
+    x_coords = np.select([side == 0, side == 1, side == 2],
+                         [radius, radius - shift - 1, -radius], shift - radius + 1)
+    y_coords = np.select([side == 0, side == 1, side == 2],
+                         [shift - radius + 1, radius, radius - shift - 1], -radius)
+    return x_coords, y_coords
+
+def find_index_array(x_coords, y_coords):
+    """ Vectorized find_index for int64 arrays of coordinates. """
+    radius = np.maximum(np.abs(x_coords), np.abs(y_coords))
+    inner_edge = 2 * radius - 1
+    shift = np.select([y_coords == -radius, y_coords == radius, x_coords == -radius],
+                      [3 * (radius * 2) + (radius + x_coords),
+                       (radius * 2) + (radius - x_coords),
+                       2 * (radius * 2) + (radius - y_coords)],
+                      radius + y_coords)
+    return inner_edge * inner_edge + shift
+
+def find_coordinates_batch(indices) -> Tuple[List[int], List[int]]:
+    """
+    Finds coordinates for many indices. NumPy integer arrays are processed vectorized and
+    give arrays back, any other iterable of (arbitrarily large) ints gives lists.
+    """
+    if np is not None and isinstance(indices, np.ndarray):
+        return find_coordinates_array(indices.astype(np.int64))
+
+    coordinates = [find_coordinates(index) for index in indices]
+    return [x for x, _ in coordinates], [y for _, y in coordinates]
+
+def count_steps_batch(indices) -> List[int]:
+    """ Finds Manhattan Distances for many indices, see find_coordinates_batch. """
+    x_coords, y_coords = find_coordinates_batch(indices)
+    if np is not None and isinstance(x_coords, np.ndarray):
+        return np.abs(x_coords) + np.abs(y_coords)
+    return [abs(x) + abs(y) for x, y in zip(x_coords, y_coords)]
+
+def find_index_batch(x_coords: Iterable[int], y_coords: Iterable[int]) -> List[int]:
+    """ Finds indices for many coordinates, see find_coordinates_batch. """
+    if np is not None and isinstance(x_coords, np.ndarray):
+        return find_index_array(x_coords.astype(np.int64), np.asarray(y_coords, dtype=np.int64))
+    return [find_index(x, y) for x, y in zip(x_coords, y_coords)]
+
+def find_ring_offset(x_coord: int, y_coord: int, radius: int):
+    """ Finds position of the point within its ring of the given radius. Ring starts from 0. """
+    if radius == 0:
+        return 0
+    if y_coord == -radius:
+        return 7 * radius + x_coord - 1
+    elif y_coord == radius:
+        return 3 * radius - x_coord - 1
+    elif x_coord == -radius:
+        return 5 * radius - y_coord - 1
+    else:
+        return radius + y_coord - 1
+
+def walk_ring(radius: int):
+    """ Yields coordinates of the ring points in the spiral order. """
+    for y_coord in range(-radius + 1, radius + 1):
+        yield (radius, y_coord)
+    for x_coord in range(radius - 1, -radius - 1, -1):
+        yield (x_coord, radius)
+    for y_coord in range(radius - 1, -radius - 1, -1):
+        yield (-radius, y_coord)
+    for x_coord in range(-radius + 1, radius + 1):
+        yield (x_coord, -radius)
+
+def sum_neighbours(x_coord: int, y_coord: int, radius: int, previous: List[int],
+                   current: List[int]):
+    """ Sums the already computed neighbours of the point on the ring of the given radius. """
+    new_value = 0
+    for i in range(-1, 2):
+        for j in range(-1, 2):
+            if i == 0 and j == 0:
+                continue
+
+            # neighbours lie on the previous, the current or the next ring
+            x_neighbour = x_coord + i
+            y_neighbour = y_coord + j
+            neighbour_radius = max(abs(x_neighbour), abs(y_neighbour))
+            if neighbour_radius < radius:
+                offset = find_ring_offset(x_neighbour, y_neighbour, neighbour_radius)
+                new_value += previous[offset]
+            elif neighbour_radius == radius:
+                offset = find_ring_offset(x_neighbour, y_neighbour, neighbour_radius)
+                if offset < len(current):
+                    new_value += current[offset]
+
+    return new_value
+
+def spiral_sums(known: Sequence[int] = ()):
+    """
+    Yields the sequence of sums of the surrounding elements. Only the previous and the
+    current rings are kept, as all neighbours of a point lie within them. Already known
+    starting values of the sequence are replayed to restore the rings and not yielded.
+    """
+    if not known:
+        yield 1
+    previous = [1]
+    radius = 1
+    count = 1
     while True:
-        # current coordinates
-        x_coord, y_coord = find_coordinates(len(numbers) + 1)
-
-        # compute new value
-        new_value = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                # do not add the element itself (even though it does not
-                # exist yet, we can save some cycles here)...
-                # or not if this will break branch predicting...
-                if i == 0 and j == 0:
-                    continue
-
-                # add existing surrounding elements
-                index = find_index(x_coord + i, y_coord + j) - 1
-                if index < len(numbers):
-                    new_value += numbers[index]
+        current = list()
+        for x_coord, y_coord in walk_ring(radius):
+            if count < len(known):
+                current.append(known[count])
+            else:
+                new_value = sum_neighbours(x_coord, y_coord, radius, previous, current)
+                current.append(new_value)
+                yield new_value
+            count += 1
+
+        previous = current
+        radius += 1
 
+def find_first_larger(value: int):
+    """ Finds first number in sequence that is larger than the provided value. """
+    for new_value in spiral_sums():
         if new_value > value:
             return new_value
 
-        # save value for future computations
-        numbers.append(new_value)
+def load_table(file_name: str) -> List[int]:
+    """
+    Loads the persisted sequence values, one per line. A partially written last line
+    (left by an interrupted process) is cut off the file.
+    """
+    if not os.path.exists(file_name):
+        return list()
+
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    lines = data.split(b'\n')
+    if lines[-1]:
+        os.truncate(file_name, len(data) - len(lines[-1]))
+    return [int(line) for line in lines[:-1]]
+
+def find_first_larger_many(values: Iterable[int], table_file: Optional[str] = None) -> List[int]:
+    """
+    Finds first number in sequence that is larger than each of the provided values, walking
+    the sequence once for all of them. If the table file is given, the sequence is read
+    from it and only extended (and appended to the file) beyond the stored values.
+    """
+    table = load_table(table_file) if table_file else list()
+    stored = len(table)
+    sequence = None
+    results = list()
+    for value in values:
+        while not table or table[-1] <= value:
+            if sequence is None:
+                sequence = spiral_sums(table[:])
+            table.append(next(sequence))
+        results.append(table[bisect.bisect_right(table, value)])
+
+    if table_file and len(table) > stored:
+        with open(table_file, 'a') as file:
+            file.write(''.join(f"{value}\n" for value in table[stored:]))
+
+    return results
 
 def main():
     """ Main function """
@@ -140,4 +299,5 @@ def main():
     # part 2
     print(find_first_larger(input_value))
 
-main()
+if __name__ == '__main__':
+    main()
@@ -38,25 +38,129 @@ Under this new system policy, how many passphrases are valid?
 Your puzzle answer was 251.
 """
 
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+import mmap
+import os
+
+# A passphrase policy: the passphrase is valid if no two of its words have the same key.
+# An empty passphrase is only valid if allow_empty is set.
+Policy = namedtuple('Policy', ['name', 'key', 'allow_empty'])
+
+def word_key(word: bytes) -> bytes:
+    """ Key of the word itself """
+    return word
+
+def anagram_key(word: bytes) -> bytes:
+    """ Key that is the same for all anagrams of the word """
+    return bytes(sorted(word))
+
+NO_REPEATS = Policy('no_repeats', word_key, False)
+NO_ANAGRAMS = Policy('no_anagrams', anagram_key, True)
+
+def check_keys(words: List[bytes], keys: List[Callable]) -> Dict[Callable, bool]:
+    """
+    Checks in a single pass whether the keys of the words are unique, for every key function.
+    Each key is computed at most once per word, and not at all after its first collision.
+    """
+    unique = dict.fromkeys(keys, True)
+    # repeated words are caught below, so the word key needs no set of its own
+    pending = [(key, set()) for key in keys if key is not word_key]
+    unique_words = set()
+    for word in words:
+        if word in unique_words:
+            # a repeated word collides under every key
+            return dict.fromkeys(keys, False)
+        unique_words.add(word)
+
+        for key, seen_keys in pending:
+            value = key(word)
+            if value in seen_keys:
+                unique[key] = False
+                pending = [entry for entry in pending if unique[entry[0]]]
+            else:
+                seen_keys.add(value)
+
+    return unique
+
+def count_valid(lines: Iterable[bytes], policies: List[Policy]) -> Dict[str, int]:
+    """ Counts passphrases that are valid under each of the policies, in one pass over lines """
+    keys = list(dict.fromkeys(policy.key for policy in policies))
+    counts = dict.fromkeys((policy.name for policy in policies), 0)
+    for line in lines:
+        words = line.split()
+        if words:
+            unique = check_keys(words, keys)
+            for policy in policies:
+                counts[policy.name] += unique[policy.key]
+        else:
+            for policy in policies:
+                counts[policy.name] += policy.allow_empty
+
+    return counts
+
+CHUNK_SIZE = 1 << 24
+
+def find_line_ranges(buffer, chunk_size: int) -> List[range]:
+    """ Splits the buffer into ranges of about chunk_size bytes that end on a line boundary """
+    ranges = list()
+    start = 0
+    while start < len(buffer):
+        end = buffer.find(b'\n', min(start + chunk_size, len(buffer)) - 1) + 1
+        if end == 0:
+            end = len(buffer)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+# passphrase file and policies of the current worker process, see count_valid_parallel
+WORKER_BUFFER = None
+WORKER_POLICIES = None
+
+def init_worker(file_name: str, policies: List[Policy]):
+    """ Maps the passphrase file once per worker process. """
+    global WORKER_BUFFER, WORKER_POLICIES
+    with open(file_name, 'rb') as file:
+        WORKER_BUFFER = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    WORKER_POLICIES = policies
+
+def count_worker_range(start: int, end: int) -> Dict[str, int]:
+    """ Runs count_valid on a range of the buffer of the current worker process. """
+    return count_valid(WORKER_BUFFER[start:end].splitlines(), WORKER_POLICIES)
+
+def count_valid_parallel(file_name: str, policies: List[Policy], workers: Optional[int] = None,
+                         chunk_size: int = CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Runs count_valid on a passphrase file using a pool of worker processes. The file is
+    memory-mapped and split into line-aligned ranges of about chunk_size bytes, every
+    worker maps it as well and validates one range at a time.
+    """
+    counts = dict.fromkeys((policy.name for policy in policies), 0)
+    if os.path.getsize(file_name) == 0:
+        return counts
+
+    with open(file_name, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            ranges = find_line_ranges(buffer, chunk_size)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(file_name, policies)) as executor:
+        starts = [line_range.start for line_range in ranges]
+        ends = [line_range.stop for line_range in ranges]
+        for range_counts in executor.map(count_worker_range, starts, ends):
+            for name, count in range_counts.items():
+                counts[name] += count
+
+    return counts
+
 def main():
     """ Main function """
-    valid_1 = 0
-    valid_2 = 0
-
-    with open('day_4_input.txt') as input_file:
-        for line in input_file:
-            words = line.split()
-            unique_words = set(words)
-            if words and (len(words) == len(unique_words)):
-                valid_1 += 1
-
-            for i in range(0, len(words)):
-                words[i] = str(sorted(list(words[i])))
-            unique_words = set(words)
-            if len(words) == len(unique_words):
-                valid_2 += 1
-
-    print(valid_1)
-    print(valid_2)
-
-main()
+    with open('day_4_input.txt', 'rb') as input_file:
+        counts = count_valid(input_file, [NO_REPEATS, NO_ANAGRAMS])
+
+    print(counts[NO_REPEATS.name])
+    print(counts[NO_ANAGRAMS.name])
+
+if __name__ == '__main__':
+    main()
@@ -54,45 +54,297 @@ How many steps does it now take to reach the exit?
 Your puzzle answer was 28707598.
 """
 
-from typing import List
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, List, MutableSequence, Optional, Sequence
+import os
+import struct
+import time
 
-def count_steps1(jumps: List[int]):
-    """ Count steps needed to get outside the jumps list """
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Offset update rule: an offset below the threshold is changed by below, any other one by
+# above. Without a threshold every offset is changed by below.
+JumpRule = namedtuple('JumpRule', ['threshold', 'below', 'above'])
+
+PART1_RULE = JumpRule(None, 1, 1)
+PART2_RULE = JumpRule(3, 1, -1)
+
+RULE_LOOPS_TEMPLATE = """
+def count_steps(jumps):
     index = 0
     steps = 0
-    while (index >= 0) and (index < len(jumps)):
+    size = len(jumps)
+    while 0 <= index < size:
         jump = jumps[index]
-        jumps[index] += 1
+{update}
         index += jump
         steps += 1
 
     return steps
 
-def count_steps2(jumps: List[int]):
+def run_steps(jumps, index, steps, limit):
+    size = len(jumps)
+    while 0 <= index < size and steps < limit:
+        jump = jumps[index]
+{update}
+        index += jump
+        steps += 1
+
+    return index, steps
+"""
+
+@lru_cache(maxsize=None)
+def compile_rule(rule: JumpRule):
+    """
+    Generates the step loops for the rule, with its constants inlined, so no function is
+    called per step. Returns count_steps(jumps) and run_steps(jumps, index, steps, limit),
+    the latter continues from the given state until outside or limit steps are made.
+    """
+    if rule.threshold is None or rule.below == rule.above:
+        update = f"        jumps[index] = jump + {int(rule.below)}"
+    else:
+        update = (f"        if jump < {int(rule.threshold)}:\n"
+                  f"            jumps[index] = jump + {int(rule.below)}\n"
+                  f"        else:\n"
+                  f"            jumps[index] = jump + {int(rule.above)}")
+
+    namespace = dict()
+    exec(RULE_LOOPS_TEMPLATE.format(update=update), namespace)
+    return namespace['count_steps'], namespace['run_steps']
+
+def count_steps(jumps: MutableSequence[int], rule: JumpRule):
+    """ Count steps needed to get outside the jumps list under the rule """
+    return compile_rule(rule)[0](jumps)
+
+def count_steps1(jumps: MutableSequence[int]):
     """ Count steps needed to get outside the jumps list """
+    return count_steps(jumps, PART1_RULE)
+
+def count_steps2(jumps: MutableSequence[int]):
+    """ Count steps needed to get outside the jumps list """
+    return count_steps(jumps, PART2_RULE)
+
+def skip_block(state: int, entry: int, block_size: int):
+    """
+    Walks through a block of settled offsets (2 or 3, stored as bits set for 3s) starting at
+    the entry position. Returns the new block state, the exit position after the block end and
+    the number of steps made.
+    """
+    position = entry
+    steps = 0
+    while position < block_size:
+        bit = 1 << position
+        if state & bit:
+            position += 3
+        else:
+            position += 2
+        state ^= bit
+        steps += 1
+    return state, position - block_size, steps
+
+def count_steps2_skipping(jumps: MutableSequence[int], block_bits: int = 5,
+                          max_skips: int = 1 << 16):
+    """
+    Count steps needed to get outside the jumps list, same as count_steps2. Offsets settle on
+    2 or 3 and stay there, so once a block of 2 ** block_bits offsets is settled, it is stored
+    as a bit mask and walked through with one lookup of a memoized skip_block result. The memo
+    is cleared when it reaches max_skips entries, so it takes at most about 150 bytes per entry
+    (10 MiB by default) however long the run is.
+    """
+    block_size = 1 << block_bits
+    size = len(jumps)
+    blocks_count = (size + block_size - 1) >> block_bits
+
+    # number of offsets that are not settled yet in each block, a partial last block
+    # is never treated as settled
+    unsettled = [0] * blocks_count
+    for index, jump in enumerate(jumps):
+        if jump != 2 and jump != 3:
+            unsettled[index >> block_bits] += 1
+    if size % block_size:
+        unsettled[-1] = block_size
+    states = [None] * blocks_count
+
+    def settle(block: int):
+        """ Stores the settled block as a bit mask """
+        start = block << block_bits
+        state = 0
+        for position in range(block_size):
+            if jumps[start + position] == 3:
+                state |= 1 << position
+        states[block] = state
+
+    for block in range(blocks_count):
+        if unsettled[block] == 0:
+            settle(block)
+
+    skips = dict()
     index = 0
     steps = 0
-    while (index >= 0) and (index < len(jumps)):
+    while 0 <= index < size:
+        block = index >> block_bits
+        state = states[block]
+        if state is not None:
+            start = block << block_bits
+            key = (state << block_bits) | (index - start)
+            skip = skips.get(key)
+            if skip is None:
+                if len(skips) >= max_skips:
+                    skips.clear()
+                skip = skips[key] = skip_block(state, index - start, block_size)
+            states[block], exit_position, skipped = skip
+            index = start + block_size + exit_position
+            steps += skipped
+            continue
+
         jump = jumps[index]
         if jump < 3:
-            jumps[index] += 1
+            jumps[index] = jump + 1
+            settled = jump == 1
         else:
-            jumps[index] -= 1
+            jumps[index] = jump - 1
+            settled = jump == 4
+        if settled:
+            unsettled[block] -= 1
+            if unsettled[block] == 0:
+                settle(block)
         index += jump
         steps += 1
 
+    # write the settled blocks back to the offsets
+    for block, state in enumerate(states):
+        if state is not None:
+            start = block << block_bits
+            for position in range(block_size):
+                jumps[start + position] = 3 if state >> position & 1 else 2
+
     return steps
 
-def main():
-    """ Main function """
-    jumps1 = list()
-    with open('day_5_input.txt') as file:
+# checkpoint file header: magic, whether the rule has a threshold, rule threshold, below
+# and above changes, index, steps, followed by the offsets as int32
+CHECKPOINT_HEADER = struct.Struct('<4s?qqqqq')
+CHECKPOINT_MAGIC = b'JMP5'
+
+def save_checkpoint(file_name: str, rule: JumpRule, index: int, steps: int,
+                    jumps: MutableSequence[int]):
+    """ Atomically writes the simulation state to the checkpoint file """
+    if not isinstance(jumps, array) or jumps.typecode != 'i':
+        jumps = array('i', jumps)
+    temp_file_name = file_name + '.tmp'
+    with open(temp_file_name, 'wb') as file:
+        file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, rule.threshold is not None,
+                                          rule.threshold or 0, rule.below, rule.above,
+                                          index, steps))
+        jumps.tofile(file)
+    os.replace(temp_file_name, file_name)
+
+def load_checkpoint(file_name: str):
+    """ Reads the rule, index, steps and offsets from the checkpoint file """
+    with open(file_name, 'rb') as file:
+        magic, has_threshold, threshold, below, above, index, steps = \
+            CHECKPOINT_HEADER.unpack(file.read(CHECKPOINT_HEADER.size))
+        if magic != CHECKPOINT_MAGIC:
+            raise RuntimeError(f"Not a checkpoint file: {file_name}")
+        jumps = array('i')
+        jumps.frombytes(file.read())
+    rule = JumpRule(threshold if has_threshold else None, below, above)
+    return rule, index, steps, jumps
+
+def count_steps_checkpointed(jumps: MutableSequence[int], rule: JumpRule, checkpoint_file: str,
+                             checkpoint_interval: float = 60.0,
+                             progress: Optional[Callable[[int, float], None]] = None,
+                             index: int = 0, steps: int = 0, batch_steps: int = 1 << 20):
+    """
+    Count steps needed to get outside the jumps list under the rule, saving the state to the
+    checkpoint file every checkpoint_interval seconds. The time is checked every batch_steps
+    steps, and progress (if given) is called then with the number of steps made so far and
+    the current steps per second. The checkpoint file is removed once the simulation is done.
+    """
+    run_steps = compile_rule(rule)[1]
+    last_checkpoint = last_report = time.perf_counter()
+    last_steps = steps
+    while 0 <= index < len(jumps):
+        index, steps = run_steps(jumps, index, steps, steps + batch_steps)
+
+        now = time.perf_counter()
+        if progress is not None:
+            progress(steps, (steps - last_steps) / max(now - last_report, 1e-9))
+            last_report = now
+            last_steps = steps
+        if now - last_checkpoint >= checkpoint_interval:
+            save_checkpoint(checkpoint_file, rule, index, steps, jumps)
+            last_checkpoint = time.perf_counter()
+
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    return steps
+
+def resume(checkpoint_file: str, checkpoint_interval: float = 60.0,
+           progress: Optional[Callable[[int, float], None]] = None):
+    """ Resumes an interrupted count_steps_checkpointed from its checkpoint file """
+    rule, index, steps, jumps = load_checkpoint(checkpoint_file)
+    return count_steps_checkpointed(jumps, rule, checkpoint_file, checkpoint_interval, progress,
+                                    index, steps)
+
+def count_steps2_batch(jump_lists: Sequence[Sequence[int]]) -> List[int]:
+    """
+    Count steps needed to get outside each of the jump lists under the part 2 rule, running
+    all of them in lockstep. The lists are padded into one 2D array and every step is made
+    for all lanes at once, lanes whose cursor got outside are dropped. The lists themselves
+    are not modified.
+    """
+    lanes = len(jump_lists)
+    lengths = np.array([len(jumps) for jumps in jump_lists], dtype=np.int64)
+    width = int(lengths.max(initial=0))
+    grid = np.zeros((lanes, width), dtype=np.int32)
+    for lane, jumps in enumerate(jump_lists):
+        grid[lane, :len(jumps)] = jumps
+    offsets = grid.ravel()
+
+    steps = np.zeros(lanes, dtype=np.int64)
+    active = np.nonzero(lengths > 0)[0]
+    starts = active * width
+    limits = lengths[active]
+    indices = np.zeros(len(active), dtype=np.int64)
+    step = 0
+    while len(active):
+        positions = starts + indices
+        jumps = offsets[positions]
+        offsets[positions] = np.where(jumps < 3, jumps + 1, jumps - 1)
+        indices += jumps
+        step += 1
+
+        inside = (indices >= 0) & (indices < limits)
+        if not inside.all():
+            # all active lanes make a step at once, so the exited ones made exactly step steps
+            steps[active[~inside]] = step
+            active = active[inside]
+            starts = starts[inside]
+            limits = limits[inside]
+            indices = indices[inside]
+
+    return steps.tolist()
+
+def load_jumps(file_name: str) -> array:
+    """ Loads jump offsets into a compact array of 32-bit ints """
+    jumps = array('i')
+    with open(file_name) as file:
         for line in file:
-            if line:
-                jumps1.append(int(line))
+            if line.strip():
+                jumps.append(int(line))
+    return jumps
 
-    jumps2 = list(jumps1)
+def main():
+    """ Main function """
+    jumps1 = load_jumps('day_5_input.txt')
+    jumps2 = array('i', jumps1)
     print(count_steps1(jumps1))
-    print(count_steps2(jumps2))
+    print(count_steps2_skipping(jumps2))
 
-main()
+if __name__ == '__main__':
+    main()
@@ -61,43 +61,152 @@ your puzzle input?
 Your puzzle answer was 2765.
 """
 
-from typing import List
+from array import array
+from typing import Callable, Dict, List, Tuple
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def redistribute(banks: List[int]):
     """ Redistributes blocks in memory banks """
     # get index of the bank withe the most blocks
     index = banks.index(max(banks))
     blocks = banks[index]
-
-    # redistribute these blocks
     banks[index] = 0
-    while blocks > 0:
-        index = (index + 1) % len(banks)
-        banks[index] += 1
-        blocks -= 1
 
-def main():
-    """ Main function """
-    with open('day_6_input.txt') as file:
-        banks = list(map(int, file.readline().split()))
+    # every bank gets the same share, the remainder goes one by one to the banks
+    # following the source one
+    share, remainder = divmod(blocks, len(banks))
+    if share:
+        for i in range(len(banks)):
+            banks[i] += share
+    for i in range(index + 1, index + 1 + remainder):
+        banks[i % len(banks)] += 1
+
+def redistribute_array(banks):
+    """ Redistributes blocks in memory banks stored in a NumPy array """
+    index = int(banks.argmax())
+    blocks = int(banks[index])
+    banks[index] = 0
 
+    share, remainder = divmod(blocks, len(banks))
+    banks += share
+    end = index + 1 + remainder
+    banks[index + 1:end] += 1
+    if end > len(banks):
+        banks[:end - len(banks)] += 1
+
+def find_cycle_dict(banks: List[int]) -> Tuple[int, int]:
+    """
+    Finds the number of redistributions until a configuration repeats and the loop size,
+    storing every configuration seen, keyed by the full configuration.
+    """
+    banks = list(banks)
     steps = 0
-    sets = dict()
+    states = dict()
     while True:
-        current_set = hash(tuple(banks))
+        state = tuple(banks)
 
-        # check if we have already seen the current set
-        if current_set in sets:
+        # check if we have already seen the current state
+        if state in states:
             # yep, we're done
-            loop_size = steps - sets[current_set]
-            break
+            return steps, steps - states[state]
 
         # nope, store it and redistribute
-        sets[current_set] = steps
+        states[state] = steps
+        redistribute(banks)
+        steps += 1
+
+# array type codes for packing banks with 1, 2 and 4 bytes per bank
+PACKED_TYPECODES = {
+    1: 'B',
+    2: 'H',
+    4: next(code for code in 'IL' if array(code).itemsize == 4),
+}
+
+def get_state_width(banks: List[int]) -> int:
+    """ Returns the number of bytes per bank enough for any configuration of these blocks """
+    return max(1, (sum(banks).bit_length() + 7) // 8)
+
+def pack_state(banks: List[int], width: int) -> bytes:
+    """ Packs the configuration into width bytes per bank """
+    typecode = PACKED_TYPECODES.get(width)
+    if typecode is not None:
+        return array(typecode, banks).tobytes()
+    return b''.join(value.to_bytes(width, 'little') for value in banks)
+
+def find_cycle_packed(banks: List[int]) -> Tuple[int, int]:
+    """
+    Finds the same as find_cycle_dict, but the configurations seen are stored as packed
+    bytes keys, which take several times less memory than tuples of ints.
+    """
+    banks = list(banks)
+    width = get_state_width(banks)
+    steps = 0
+    states = dict()
+    while True:
+        state = pack_state(banks, width)
+        if state in states:
+            return steps, steps - states[state]
+
+        states[state] = steps
         redistribute(banks)
         steps += 1
 
+def find_cycle_brent(banks: List[int]) -> Tuple[int, int]:
+    """
+    Finds the same as find_cycle_dict using Brent's cycle detection, which keeps only
+    two configurations at a time.
+    """
+    # find the loop size: the hare runs ahead, the tortoise jumps to it at powers of two
+    tortoise = list(banks)
+    hare = list(banks)
+    redistribute(hare)
+    power = loop_size = 1
+    while tortoise != hare:
+        if power == loop_size:
+            tortoise = list(hare)
+            power *= 2
+            loop_size = 0
+        redistribute(hare)
+        loop_size += 1
+
+    # find the loop start: move both from the beginning, the hare loop_size steps ahead
+    tortoise = list(banks)
+    hare = list(banks)
+    for _ in range(loop_size):
+        redistribute(hare)
+    loop_start = 0
+    while tortoise != hare:
+        redistribute(tortoise)
+        redistribute(hare)
+        loop_start += 1
+
+    return loop_start + loop_size, loop_size
+
+CYCLE_FINDERS: Dict[str, Callable[[List[int]], Tuple[int, int]]] = {
+    'packed': find_cycle_packed,
+    'dict': find_cycle_dict,
+    'brent': find_cycle_brent,
+}
+
+def main():
+    """ Main function """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=list(CYCLE_FINDERS), default='packed',
+                        help="cycle detection: store all states (packed or as tuples) "
+                             "or Brent's algorithm")
+    args = parser.parse_args()
+
+    with open('day_6_input.txt') as file:
+        banks = list(map(int, file.readline().split()))
+
+    steps, loop_size = CYCLE_FINDERS[args.mode](banks)
     print(steps)
     print(loop_size)
 
-main()
+if __name__ == '__main__':
+    main()
@@ -99,8 +99,9 @@ to be to balance the entire tower?
 Your puzzle answer was 529.
 """
 
-from typing import List
-import queue
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 class Node:
     """ A class that represents tree node """
@@ -108,6 +109,7 @@ class Node:
         self.name = name
         self.weight = 0
         self.children_weight = 0
+        self.children_weight_computed = False
         self.parent: Node = None
         self.children: List[Node] = list()
 
@@ -118,15 +120,12 @@ class Node:
 
     def update_children_weight(self):
         """ Updates weight of all children """
-        if (self.children_weight == 0) and self.children:
-            self.children_weight = sum(map(lambda n: n.get_total_weight(), self.children))
+        if not self.children_weight_computed:
+            compute_children_weights(self)
 
     def get_leafs(self):
         """ Returns all sub-nodes that are leafs """
-        leafs = list({node for node in self.children if not node.children})
-        for node in self.children:
-            leafs.extend(node.get_leafs())
-        return leafs
+        return [node for node in iter_post_order(self) if node is not self and not node.children]
 
     def get_siblings(self):
         """ Returns node's siblings """
@@ -135,6 +134,36 @@ class Node:
         else:
             return self.parent.children
 
+def iter_post_order(root_node: Node) -> Iterator[Node]:
+    """ Iterates over the subtree so that children always come before their parent """
+    stack = [(root_node, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children)
+
+def compute_children_weights(root_node: Node):
+    """
+    Computes children weights of all nodes in the subtree in a single iterative post-order
+    pass, so deep trees do not hit the recursion limit. Already computed subtrees are skipped.
+    """
+    stack = [(root_node, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if node.children_weight_computed:
+            continue
+
+        if children_done:
+            node.children_weight = sum(child.weight + child.children_weight
+                                       for child in node.children)
+            node.children_weight_computed = True
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children)
+
 def read_tree(file_name: str) -> Node:
     """ Reads tree from the file and returns a root node """
 
@@ -165,63 +194,308 @@ def read_tree(file_name: str) -> Node:
 
     return list({n for n in all_nodes.values() if n.parent is None})[0]
 
-def is_parent_lighter(node: Node) -> bool:
-    """ Determines if the parent of the node is lighter than its (parent's) siblings """
-    parent_siblings = node.parent.get_siblings()
-    if len(parent_siblings) < 2:
-        if node.parent.parent is None:
-            return False
-        return is_parent_lighter(node.parent)
+def find_majority_weight(nodes: List[Node]) -> Optional[int]:
+    """ Returns the total weight shared by more than one of the nodes, if there is one """
+    weight, count = Counter(node.get_total_weight() for node in nodes).most_common(1)[0]
+    return weight if count > 1 else None
 
-    parent_index = parent_siblings.index(node.parent)
-    parent_sibling_index = (parent_index+1) % len(parent_siblings)
-    return node.parent.get_total_weight() < parent_siblings[parent_sibling_index].get_total_weight
+def find_imbalance(root_node: Node) -> Optional[Tuple[Node, int]]:
+    """
+    Finds the node with the wrong weight and the weight it should have, in a single bottom-up
+    pass. Returns None if the tree is balanced or the wrong node cannot be determined.
+    """
+    root_node.update_children_weight()
 
-def get_correct_weight(root_node: Node) -> int:
+    # children come first, so the first unbalanced node found is the deepest one
+    unbalanced = None
+    for node in iter_post_order(root_node):
+        weights = {child.get_total_weight() for child in node.children}
+        if len(weights) > 1:
+            unbalanced = node
+            break
+    if unbalanced is None:
+        return None
+
+    return resolve_imbalance(unbalanced)
+
+def resolve_imbalance(unbalanced: Node) -> Optional[Tuple[Node, int]]:
+    """
+    Finds the child with the wrong weight and the weight it should have, for the node whose
+    children are unbalanced while their own children are balanced.
+    """
+    children = unbalanced.children
+    majority_weight = find_majority_weight(children)
+    if majority_weight is not None:
+        # the only child with a different total weight is the wrong one
+        wrong = next(node for node in children if node.get_total_weight() != majority_weight)
+        return wrong, wrong.weight + (majority_weight - wrong.get_total_weight())
+
+    # two children: either one can be wrong, so go up until it is known whether the whole
+    # branch is heavier or lighter than it should be
+    lighter, heavier = sorted(children[:2], key=Node.get_total_weight)
+    difference = heavier.get_total_weight() - lighter.get_total_weight()
+    branch = unbalanced
+    while branch.parent is not None:
+        majority_weight = find_majority_weight(branch.get_siblings())
+        if majority_weight is not None:
+            if branch.get_total_weight() < majority_weight:
+                return lighter, lighter.weight + difference
+            return heavier, heavier.weight - difference
+        branch = branch.parent
+
+    return None
+
+def get_correct_weight(root_node: Node) -> Optional[int]:
     """ Returns the correct weight for the only unbalanced node """
-    nodes = queue.Queue()
-    processed_nodes = set()
-    for leaf in root_node.get_leafs():
-        nodes.put(leaf)
-
-    while nodes:
-        node: Node = nodes.get()
-        if node in processed_nodes:
-            continue
+    imbalance = find_imbalance(root_node)
+    return imbalance[1] if imbalance is not None else None
+
+class Tower:
+    """
+    A tower that can be changed, keeping total weights and the set of unbalanced nodes up to
+    date. A weight change only updates the nodes on the path to the root, moving a program
+    also updates the depths of the programs it holds.
+    """
+    def __init__(self, root_node: Node):
+        root_node.update_children_weight()
+        self.nodes: Dict[str, Node] = dict()
+        # number of children of every node for each of their total weights
+        self.children_weights: Dict[Node, Counter] = dict()
+        self.unbalanced: Set[Node] = set()
+        self.depths: Dict[Node, int] = dict()
+        self.update_depths(root_node, 0)
+        for node in iter_post_order(root_node):
+            self.nodes[node.name] = node
+            self.children_weights[node] = Counter(child.get_total_weight()
+                                                  for child in node.children)
+            self.update_balance(node)
+
+    def update_depths(self, node: Node, depth: int):
+        """ Stores depths of the node and of everything it holds """
+        stack = [(node, depth)]
+        while stack:
+            node, depth = stack.pop()
+            self.depths[node] = depth
+            stack.extend((child, depth + 1) for child in node.children)
+
+    def update_balance(self, node: Node):
+        """ Updates whether the node is in the set of unbalanced nodes """
+        if len(self.children_weights[node]) > 1:
+            self.unbalanced.add(node)
+        else:
+            self.unbalanced.discard(node)
+
+    def add_child_weight(self, node: Node, total_weight: int, count: int):
+        """ Adds count children with the total weight to the node's children weights """
+        weights = self.children_weights[node]
+        weights[total_weight] += count
+        if weights[total_weight] == 0:
+            del weights[total_weight]
+        self.update_balance(node)
+
+    def add_weight(self, node: Node, delta: int):
+        """ Adds delta to the children weight of the node and of all its ancestors """
+        while node is not None and delta != 0:
+            total_weight = node.get_total_weight()
+            node.children_weight += delta
+            if node.parent is not None:
+                self.add_child_weight(node.parent, total_weight, -1)
+                self.add_child_weight(node.parent, total_weight + delta, 1)
+            node = node.parent
+
+    def set_weight(self, name: str, weight: int):
+        """ Changes the weight of the program """
+        node = self.nodes[name]
+        total_weight = node.get_total_weight()
+        delta = weight - node.weight
+        node.weight = weight
+        if node.parent is not None and delta != 0:
+            self.add_child_weight(node.parent, total_weight, -1)
+            self.add_child_weight(node.parent, total_weight + delta, 1)
+            self.add_weight(node.parent, delta)
+
+    def reparent(self, name: str, parent_name: str):
+        """ Moves the program with everything it holds onto another program """
+        node = self.nodes[name]
+        new_parent = self.nodes[parent_name]
+        ancestor = new_parent
+        while ancestor is not None:
+            if ancestor is node:
+                raise RuntimeError(f"Cannot move {name} onto its own subtower {parent_name}")
+            ancestor = ancestor.parent
+
+        total_weight = node.get_total_weight()
+        old_parent = node.parent
+        old_parent.children.remove(node)
+        self.add_child_weight(old_parent, total_weight, -1)
+        self.add_weight(old_parent, -total_weight)
+
+        node.parent = new_parent
+        new_parent.children.append(node)
+        self.add_child_weight(new_parent, total_weight, 1)
+        self.add_weight(new_parent, total_weight)
+        self.update_depths(node, self.depths[new_parent] + 1)
+
+    def is_balanced(self) -> bool:
+        """ Returns whether every program holds sub-towers of equal weights """
+        return not self.unbalanced
+
+    def find_imbalance(self) -> Optional[Tuple[Node, int]]:
+        """ Same as find_imbalance, using the tracked unbalanced nodes """
+        if not self.unbalanced:
+            return None
+
+        return resolve_imbalance(max(self.unbalanced, key=self.depths.__getitem__))
+
+class CompactTower:
+    """
+    A tower stored as flat arrays indexed by program ids instead of Node objects: weights,
+    parents and total weights are typed arrays, children are stored in one array where
+    children of program i are children[child_offsets[i]:child_offsets[i + 1]].
+    """
+    def __init__(self, names: List[str], weights: array, parents: array, child_offsets: array,
+                 children: array):
+        self.names = names
+        self.weights = weights
+        self.parents = parents
+        self.child_offsets = child_offsets
+        self.children = children
+        self.ids: Optional[Dict[str, int]] = None
+        self.root = parents.index(-1)
+
+        # total weights, computed from the deepest programs up
+        self.order = self.get_breadth_first_order()
+        self.total_weights = array('q', weights)
+        for node in reversed(self.order):
+            parent = parents[node]
+            if parent != -1:
+                self.total_weights[parent] += self.total_weights[node]
+
+    def get_breadth_first_order(self) -> array:
+        """ Returns program ids ordered by their depth, starting with the root """
+        order = array('i', [self.root])
+        position = 0
+        while position < len(order):
+            order.extend(self.get_children(order[position]))
+            position += 1
+        return order
+
+    def get_id(self, name: str) -> int:
+        """ Returns id of the program, the name index is only built on the first call """
+        if self.ids is None:
+            self.ids = {name: node for node, name in enumerate(self.names)}
+        return self.ids[name]
+
+    def get_children(self, node: int) -> array:
+        """ Returns ids of the programs standing on the program """
+        return self.children[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def get_siblings(self, node: int) -> array:
+        """ Returns program's siblings (including itself) """
+        parent = self.parents[node]
+        if parent == -1:
+            return array('i')
+        return self.get_children(parent)
+
+    def get_total_weight(self, node: int) -> int:
+        """ Returns a total weight of the program """
+        return self.total_weights[node]
+
+    def get_leafs(self, node: int) -> List[int]:
+        """ Returns all programs in the sub-tower that hold nothing """
+        leafs = list()
+        stack = list(self.get_children(node))
+        while stack:
+            child = stack.pop()
+            children = self.get_children(child)
+            if children:
+                stack.extend(children)
+            else:
+                leafs.append(child)
+        return leafs
+
+    def find_majority_weight(self, nodes: array) -> Optional[int]:
+        """ Returns the total weight shared by more than one of the programs, if there is one """
+        weight, count = Counter(self.total_weights[node] for node in nodes).most_common(1)[0]
+        return weight if count > 1 else None
+
+    def find_imbalance(self) -> Optional[Tuple[int, int]]:
+        """ Same as find_imbalance, returns the program id and the weight it should have """
+        # the deepest programs come first, so the first unbalanced one is the deepest one
+        total_weights = self.total_weights
+        unbalanced = next((node for node in reversed(self.order)
+                           if len({total_weights[child] for child in self.get_children(node)}) > 1),
+                          None)
+        if unbalanced is None:
+            return None
+
+        children = self.get_children(unbalanced)
+        majority_weight = self.find_majority_weight(children)
+        if majority_weight is not None:
+            wrong = next(node for node in children if total_weights[node] != majority_weight)
+            return wrong, self.weights[wrong] + (majority_weight - total_weights[wrong])
+
+        # two children, see resolve_imbalance
+        lighter, heavier = sorted(children[:2], key=total_weights.__getitem__)
+        difference = total_weights[heavier] - total_weights[lighter]
+        branch = unbalanced
+        while self.parents[branch] != -1:
+            majority_weight = self.find_majority_weight(self.get_siblings(branch))
+            if majority_weight is not None:
+                if total_weights[branch] < majority_weight:
+                    return lighter, self.weights[lighter] + difference
+                return heavier, self.weights[heavier] - difference
+            branch = self.parents[branch]
+
+        return None
+
+    def get_correct_weight(self) -> Optional[int]:
+        """ Returns the correct weight for the only unbalanced program """
+        imbalance = self.find_imbalance()
+        return imbalance[1] if imbalance is not None else None
+
+def read_compact_tree(file_name: str) -> CompactTower:
+    """ Reads tree from the file into a CompactTower """
+    ids: Dict[str, int] = dict()
+    names: List[str] = list()
+    weights = array('q')
+    def get_id(name: str) -> int:
+        """ Gets an id by program name, or assigns a new one """
+        node = ids.get(name)
+        if node is None:
+            node = ids[name] = len(names)
+            names.append(name)
+            weights.append(0)
+        return node
+
+    edge_parents = array('i')
+    edge_children = array('i')
+    with open(file_name) as file:
+        for line in file:
+            parts = line.strip('\r\n').split(' ')
 
-        siblings = node.get_siblings()
-        nodes.put(node.parent)
-
-        for i in range(1, len(siblings)):
-            total_weight_i = siblings[i].get_total_weight()
-            total_weight_i_1 = siblings[i-1].get_total_weight()
-            if siblings[i].get_total_weight() != siblings[i-1].get_total_weight():
-                if len(siblings) > 2:
-                    # if there are more than 2 siblings, compare weight with another sibling
-                    if total_weight_i != siblings[(i+1) % len(siblings)].get_total_weight():
-                        # i-th sibling has total weight different from (i-1)-th and (i+1)-th
-                        # siblings, so we adjust its weight to match the total weight of
-                        # (i-1)-th sibling
-                        return siblings[i].weight + (total_weight_i_1 - total_weight_i)
-                    else:
-                        # i-th sibling has the same total weight as (i+1)-th sibling, so we adjust
-                        # the (i-1)-th sibling weight to match the total weight of i-th sibling
-                        return siblings[i-1].weight + (total_weight_i - total_weight_i_1)
-                else:
-                    # if there are two siblings, compare weight of parent
-                    if is_parent_lighter(siblings[i]):
-                        # the parent is lighter than its siblings, so we take the lighter node
-                        # and add to its weight
-                        return min(siblings[i].weight, siblings[i-1].weight) + \
-                            abs(total_weight_i - total_weight_i_1)
-                    else:
-                        # the parent is heavier than its siblings, so we take the heavier node
-                        # and substract from its weight
-                        return max(siblings[i].weight, siblings[i-1].weight) - \
-                            abs(total_weight_i - total_weight_i_1)
-
-        for sibling in siblings:
-            processed_nodes.add(sibling)
+            node = get_id(parts[0])
+            weights[node] = int(parts[1][1:-1])
+            for i in range(3, len(parts)):
+                edge_parents.append(node)
+                edge_children.append(get_id(parts[i].strip(',')))
+
+    # lay the children out by parent, counting sort style
+    parents = array('i', [-1]) * len(names)
+    child_offsets = array('i', [0]) * (len(names) + 1)
+    for parent in edge_parents:
+        child_offsets[parent + 1] += 1
+    for node in range(len(names)):
+        child_offsets[node + 1] += child_offsets[node]
+
+    children = array('i', [0]) * len(edge_children)
+    positions = array('i', child_offsets)
+    for parent, child in zip(edge_parents, edge_children):
+        children[positions[parent]] = child
+        positions[parent] += 1
+        parents[child] = parent
+
+    return CompactTower(names, weights, parents, child_offsets, children)
 
 def main():
     """ Main function """
@@ -230,4 +504,5 @@ def main():
     print(root_node.name)
     print(get_correct_weight(root_node))
 
-main()
+if __name__ == '__main__':
+    main()